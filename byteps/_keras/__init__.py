@@ -18,7 +18,7 @@ import byteps.tensorflow as bps
 import tensorflow as tf
 
 def create_distributed_optimizer(keras, optimizer, name, device_dense, device_sparse,
-                                 compression, sparse_as_dense):
+                                 compression, sparse_as_dense, compression_params=None):
     class _DistributedOptimizer(keras.optimizers.Optimizer):
         _HAS_AGGREGATE_GRAD = True
         def __init__(self, **kwargs):
@@ -26,6 +26,7 @@ def create_distributed_optimizer(keras, optimizer, name, device_dense, device_sp
             self._device_dense = device_dense
             self._device_sparse = device_sparse
             self._compression = compression
+            self._compression_params = compression_params
             self._sparse_as_dense = sparse_as_dense
             self._aggregated_gradients = False
             super(self.__class__, self).__init__(**kwargs)
@@ -57,7 +58,8 @@ def create_distributed_optimizer(keras, optimizer, name, device_dense, device_sp
                             avg_grad = bps.push_pull(grad, scope,
                                                      device_dense=self._device_dense,
                                                      device_sparse=self._device_sparse,
-                                                     compression=self._compression)
+                                                     compression=self._compression,
+                                                     compression_params=self._compression_params)
                             averaged_gradients.append(avg_grad)
                         else:
                             averaged_gradients.append(None)
@@ -79,7 +81,12 @@ def create_distributed_optimizer(keras, optimizer, name, device_dense, device_sp
     # model could be easily restored without BytePS.
     cls = type(optimizer.__class__.__name__, (optimizer.__class__,),
                dict(_DistributedOptimizer.__dict__))
-    return cls.from_config(optimizer.get_config())
+    # An optimizer wrapping another one (e.g. LossScaleOptimizer) deserializes the inner
+    # optimizer in from_config, which must be able to find it if it is a custom class.
+    inner = getattr(optimizer, '_optimizer', None)
+    custom_objects = {inner.__class__.__name__: inner.__class__} if inner is not None else {}
+    with keras.utils.custom_object_scope(custom_objects):
+        return cls.from_config(optimizer.get_config())
 
 
 def _eval(backend, op_or_result):
@@ -115,7 +122,23 @@ def load_model(keras, wrap_optimizer, optimizer_modules, filepath, custom_optimi
             for cls in custom_optimizers
         })
 
+    # LossScaleOptimizer takes the optimizer it wraps as an instance, so it cannot be
+    # created from its config as keyword arguments; restore it with from_config instead.
+    loss_scale_optimizer = _loss_scale_optimizer_class(keras)
+    if loss_scale_optimizer is not None:
+        inner_objects = dict(custom_objects or {})
+        inner_objects.update({cls.__name__: cls for cls in custom_optimizers or []})
+        byteps_objects[loss_scale_optimizer.__name__] = wrap_optimizer(
+            lambda **config: loss_scale_optimizer.from_config(config, custom_objects=inner_objects))
+
     if custom_objects is not None:
         byteps_objects.update(custom_objects)
 
     return keras.models.load_model(filepath, custom_objects=byteps_objects)
+
+
+def _loss_scale_optimizer_class(keras):
+    try:
+        return keras.mixed_precision.experimental.LossScaleOptimizer
+    except AttributeError:
+        return None
@@ -126,25 +126,32 @@ class LearningRateScheduleCallbackImpl(object):
                              '%s() or upgrade to the latest version of Keras.'
                              % self.__class__.__name__)
 
+    @property
+    def _optimizer(self):
+        # Optimizers wrapping another one, such as LossScaleOptimizer, keep the learning rate
+        # and the momentum on the wrapped optimizer.
+        optimizer = self.model.optimizer
+        return getattr(optimizer, '_optimizer', optimizer)
+
     def _adjust_learning_rate(self, epoch):
-        old_lr = self.backend.get_value(self.model.optimizer.lr)
+        old_lr = self.backend.get_value(self._optimizer.lr)
         new_lr = self.initial_lr * self.multiplier(epoch)
-        self.backend.set_value(self.model.optimizer.lr, new_lr)
+        self.backend.set_value(self._optimizer.lr, new_lr)
 
-        if hasattr(self.model.optimizer, 'momentum') and self.momentum_correction:
+        if hasattr(self._optimizer, 'momentum') and self.momentum_correction:
             # See the paper cited above for more information about momentum correction.
-            self.restore_momentum = self.backend.get_value(self.model.optimizer.momentum)
-            self.backend.set_value(self.model.optimizer.momentum,
+            self.restore_momentum = self.backend.get_value(self._optimizer.momentum)
+            self.backend.set_value(self._optimizer.momentum,
                                    self.restore_momentum * new_lr / old_lr)
 
     def _restore_momentum_if_needed(self):
         if self.restore_momentum:
-            self.backend.set_value(self.model.optimizer.momentum, self.restore_momentum)
+            self.backend.set_value(self._optimizer.momentum, self.restore_momentum)
             self.restore_momentum = None
 
     def on_train_begin(self, logs=None):
         if self.initial_lr is None:
-            self.initial_lr = self.backend.get_value(self.model.optimizer.lr)
+            self.initial_lr = self.backend.get_value(self._optimizer.lr)
         if not self.staircase and not self.steps_per_epoch:
             self.steps_per_epoch = self._autodetect_steps_per_epoch()
 
@@ -170,7 +177,7 @@ class LearningRateScheduleCallbackImpl(object):
     def on_epoch_end(self, epoch, logs=None):
         if logs is not None:
             # Log current learning rate.
-            logs['lr'] = self.backend.get_value(self.model.optimizer.lr)
+            logs['lr'] = self.backend.get_value(self._optimizer.lr)
 
 
 class LearningRateWarmupCallbackImpl(LearningRateScheduleCallbackImpl):
@@ -191,6 +198,6 @@ class LearningRateWarmupCallbackImpl(LearningRateScheduleCallbackImpl):
         super(LearningRateWarmupCallbackImpl, self).on_epoch_end(epoch, logs)
 
         if epoch == self.end_epoch - 1 and self.verbose > 0:
-            new_lr = self.backend.get_value(self.model.optimizer.lr)
+            new_lr = self.backend.get_value(self._optimizer.lr)
             print('\nEpoch %d: finished gradual learning rate warmup to %g.' %
                   (epoch + 1, new_lr))
@@ -13,6 +13,7 @@
 // limitations under the License.
 // =============================================================================
 
+#include <algorithm>
 #include <cstring>
 #include <queue>
 
@@ -36,7 +37,15 @@ CompressorRegistry::Register reg(
       } else {
         k = static_cast<unsigned>(factor);
       }
-      return std::unique_ptr<Compressor>(new TopkCompressor(size, dtype, k));
+      auto encode =
+          HyperParamFinder<bool>(kwargs, "compressor_topk_encode", true);
+      // float16 entries are too small to be encoded in place
+      if (encode && dtype == BYTEPS_FLOAT16) {
+        BPS_LOG(WARNING) << "compressor_topk_encode is ignored for float16";
+        encode = false;
+      }
+      return std::unique_ptr<Compressor>(
+          new TopkCompressor(size, dtype, k, encode));
     });
 }
 
@@ -69,9 +78,55 @@ tensor_t TopkCompressor::CompressImpl(index_t* dst, const scalar_t* src,
     }
   }
 
+  if (_encode) {
+    return {dst, Encode(beg)};
+  }
   return {dst, this->_k * sizeof(pair_t)};
 }
 
+template <typename index_t, typename scalar_t>
+size_t TopkCompressor::Encode(std::pair<index_t, scalar_t>* pairs) {
+  using pair_t = std::pair<index_t, scalar_t>;
+  std::sort(pairs, pairs + this->_k, [](const pair_t& lhs, const pair_t& rhs) {
+    return lhs.first < rhs.first;
+  });
+
+  // encode in place: an entry is read before being overwritten since its
+  // encoding is shorter than sizeof(pair_t)
+  auto out = reinterpret_cast<uint8_t*>(pairs);
+  size_t pos = 0;
+  index_t last = 0;
+  for (size_t i = 0; i < this->_k; ++i) {
+    auto pair = pairs[i];
+    pos += VarintEncode(out + pos, pair.first - last);
+    last = pair.first;
+    // saturate, as inf would end up in the error of error feedback for good
+    constexpr float kHalfMax = 65504.0f;
+    half_t value(std::max(-kHalfMax,
+                          std::min(kHalfMax, static_cast<float>(pair.second))));
+    std::memcpy(out + pos, &value.half_, sizeof(uint16_t));
+    pos += sizeof(uint16_t);
+  }
+  return pos;
+}
+
+template <typename F>
+void TopkCompressor::ForEachEncoded(const byte_t* compressed,
+                                    size_t compressed_size, F&& func) {
+  auto ptr = reinterpret_cast<const uint8_t*>(compressed);
+  size_t pos = 0;
+  unsigned long index = 0;
+  while (pos < compressed_size) {
+    unsigned long diff;
+    pos += VarintDecode(ptr + pos, &diff);
+    index += diff;
+    uint16_t bits;
+    std::memcpy(&bits, ptr + pos, sizeof(uint16_t));
+    pos += sizeof(uint16_t);
+    func(index, static_cast<float>(half_t::Binary(bits)));
+  }
+}
+
 tensor_t TopkCompressor::Compress(tensor_t grad) {
   COMPRESS_IMPL_SWITCH(grad.dtype, CompressImpl, _buf.get(), grad.data,
                        grad.size);
@@ -93,6 +148,11 @@ tensor_t TopkCompressor::DecompressImpl(scalar_t* dst, const index_t* src,
 
   // reset to zeros
   std::memset(dst, 0, _size);
+  if (_encode) {
+    ForEachEncoded(reinterpret_cast<const byte_t*>(ptr), compressed_size,
+                   [dst](size_t i, float value) { dst[i] = value; });
+    return {dst, _size};
+  }
   size_t len = compressed_size / sizeof(pair_t);
   for (size_t i = 0; i < len; ++i) {
     auto& pair = ptr[i];
@@ -121,6 +181,13 @@ void TopkCompressor::FastUpdateErrorImpl(scalar_t* error, scalar_t* corrected,
   using pair_t = std::pair<index_t, scalar_t>;
 
   std::memcpy(error, corrected, _size);
+  if (_encode) {
+    ForEachEncoded(reinterpret_cast<const byte_t*>(compressed), compressed_size,
+                   [error, corrected](size_t i, float value) {
+                     error[i] = corrected[i] - value;
+                   });
+    return;
+  }
 
   auto ptr = reinterpret_cast<const pair_t*>(compressed);
   for (size_t i = 0; i < this->_k; ++i) {
@@ -30,11 +30,15 @@ namespace compressor {
  *
  * sending the most significant entries of the stochastic gradient
  *
+ * \note with `encode` the selected entries are sorted by index and packed as
+ * varint-encoded index gaps followed by fp16 values, i.e. at most 7 bytes and
+ * typically 3-4 bytes per entry instead of 8 for float32 gradients.
  */
 class TopkCompressor : public Compressor {
  public:
-  TopkCompressor(size_t size, DataType dtype, unsigned int k)
-      : Compressor(size, dtype), _k(k){};
+  TopkCompressor(size_t size, DataType dtype, unsigned int k,
+                 bool encode = false)
+      : Compressor(size, dtype), _k(k), _encode(encode){};
   virtual ~TopkCompressor() = default;
 
   /*!
@@ -63,7 +67,8 @@ class TopkCompressor : public Compressor {
    * \brief faster version of `UpdateError`
    *
    * 1. e <- p (e is the error and p is the corrected gradient)
-   * 2. zero-fill e with selected k indices
+   * 2. zero-fill e with selected k indices, or keep the fp16 rounding error
+   *    of the selected entries if encoded
    *
    * \param corrected gradient corrected with error
    * \param error error
@@ -84,8 +89,16 @@ class TopkCompressor : public Compressor {
   void FastUpdateErrorImpl(scalar_t* error, scalar_t* corrected,
                            const index_t* compressed, size_t compressed_size);
 
+  template <typename index_t, typename scalar_t>
+  size_t Encode(std::pair<index_t, scalar_t>* pairs);
+
+  template <typename F>
+  void ForEachEncoded(const byte_t* compressed, size_t compressed_size,
+                      F&& func);
+
  private:
   unsigned int _k;
+  bool _encode;
 };
 }  // namespace compressor
 }  // namespace common
@@ -214,6 +214,37 @@ unsigned long EliasDeltaDecode(BitReader<T>& bit_reader) {
   return num;
 }
 
+/*!
+ * \brief encode `x` as a LEB128 varint, 7 bits per byte
+ *
+ * \return number of bytes written to `dst` (at most 10)
+ */
+inline size_t VarintEncode(uint8_t* dst, unsigned long x) {
+  size_t len = 0;
+  while (x >= 0x80) {
+    dst[len++] = static_cast<uint8_t>(x | 0x80);
+    x >>= 7;
+  }
+  dst[len++] = static_cast<uint8_t>(x);
+  return len;
+}
+
+/*!
+ * \brief decode a LEB128 varint written by `VarintEncode`
+ *
+ * \return number of bytes read from `src`
+ */
+inline size_t VarintDecode(const uint8_t* src, unsigned long* x) {
+  size_t len = 0;
+  int shift = 0;
+  *x = 0;
+  do {
+    *x |= static_cast<unsigned long>(src[len] & 0x7f) << shift;
+    shift += 7;
+  } while (src[len++] & 0x80);
+  return len;
+}
+
 template <typename T, class F = std::function<bool(T)>>
 T HyperParamFinder(const kwargs_t& kwargs, std::string name,
                    bool optional = false, F&& check = [](T) { return true; }) {
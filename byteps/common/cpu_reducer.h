@@ -78,6 +78,26 @@ class CpuReducer {
     }
     return result;
   }
+
+  // Query CPUID and XCR0 to determine AVX-512F runtime support, including
+  // whether the OS saves the opmask and ZMM registers.
+  bool is_avx512f() {
+    static bool initialized = false;
+    static bool result = false;
+    if (!initialized) {
+      unsigned int eax, ebx, ecx, edx;
+      if (__get_cpuid(1, &eax, &ebx, &ecx, &edx) && (ecx & bit_OSXSAVE)) {
+        unsigned int xcr0, xcr0_hi;
+        __asm__("xgetbv" : "=a"(xcr0), "=d"(xcr0_hi) : "c"(0));
+        if ((xcr0 & 0xe6) == 0xe6 &&
+            __get_cpuid_count(7, 0, &eax, &ebx, &ecx, &edx)) {
+          result = (ebx & bit_AVX512F);
+        }
+      }
+      initialized = true;
+    }
+    return result;
+  }
 #endif
 
   inline void HalfBits2Float(const unsigned short* src, float* res) {
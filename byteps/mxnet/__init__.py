@@ -272,6 +272,9 @@ class DistributedTrainer(mx.gluon.Trainer):
                 # raise KeyError if 'k' is not found
                 setattr(param, "byteps_compressor_k",
                         compression_params["k"])
+                if compressor == "topk":
+                    setattr(param, "byteps_compressor_topk_encode", str(
+                        compression_params.get("encode", False)))
 
             if compression_params.get("momentum"):
                 setattr(param, "byteps_momentum_mu",
@@ -38,7 +38,8 @@ Sum = "Sum"
 Adasum = "Adasum"
 
 def push_pull(tensor, scope='', average=None, device_dense='', device_sparse='',
-              compression=Compression.none, op=None, enable_async=False):
+              compression=Compression.none, op=None, enable_async=False,
+              compression_params=None):
     """Perform an push_pull on a tf.Tensor or tf.IndexedSlices.
     Arguments:
         tensor: tf.Tensor, tf.Variable, or tf.IndexedSlices to reduce.
@@ -58,6 +59,10 @@ def push_pull(tensor, scope='', average=None, device_dense='', device_sparse='',
                      using compression.
         op: The reduction operation to combine tensors across different ranks.
             Defaults to Average if None is given.
+        compression_params: Optional dict selecting a compressor of BytePS core
+                            for inter-node communication, e.g.
+                            `{'compressor': 'topk', 'k': 0.001, 'ef': 'vanilla'}`.
+                            Defaults to no inter-node compression.
 
     Returns:
         A tensor of the same shape and type as `tensor`, summed across all
@@ -70,7 +75,8 @@ def push_pull(tensor, scope='', average=None, device_dense='', device_sparse='',
     with tf.device(device_dense):
         byteps_size = tf.cast(size(), dtype=tensor.dtype)
         tensor_compressed, ctx = compression.compress(tensor)
-        summed_tensor_compressed = _push_pull(tensor_compressed, scope)
+        summed_tensor_compressed = _push_pull(tensor_compressed, scope,
+                                              compression_params=compression_params)
         summed_tensor = compression.decompress(summed_tensor_compressed, ctx)
         if not enable_async:
             _div = tf.div if hasattr(tf, 'div') else tf.math.divide
@@ -114,12 +120,49 @@ def broadcast_variables(variables, root_rank, scope=''):
         root_rank: rank of the process from which global variables will be broadcasted
                    to all other processes.
         scope: the graph name scope
+
+    Variables of the same dtype are flattened into a single buffer that is
+    broadcasted at once, so that a whole model costs one push_pull per dtype
+    instead of one per variable.
     """
     if size() <= 1:
         return tf.group(*variables)
+    return _broadcast_bundled(
+        variables,
+        lambda tensor, is_variable: broadcast(tensor, root_rank, scope, is_variable=is_variable))
+
+def _broadcast_bundled(variables, broadcast_fn):
+    """Assigns the broadcasted values to `variables`, one bundle per dtype.
+    `broadcast_fn(tensor, is_variable)` broadcasts a single tensor.
+    """
     _assign = tf.assign if hasattr(tf, 'assign') else tf.compat.v1.assign
-    return tf.group(*[_assign(var, broadcast(var, root_rank, scope))
-                      for var in variables])
+    assign_ops = []
+    bundles = {}
+    for var in variables:
+        if var.shape.is_fully_defined():
+            bundles.setdefault(var.dtype.base_dtype, []).append(var)
+        else:
+            assign_ops.append(_assign(var, broadcast_fn(var, True)))
+    # Iterate in a fixed order so that all ranks declare the bundles identically.
+    for dtype in sorted(bundles, key=lambda dtype: dtype.name):
+        # Order by name, as the variables may have been created in a different
+        # order on every rank.
+        bundle = sorted(bundles[dtype], key=lambda var: var.name)
+        sizes = [var.shape.num_elements() for var in bundle]
+        # Fail instead of mixing up values when ranks disagree on the bundle.
+        total = tf.constant(sum(sizes), dtype=tf.int32,
+                            name='BroadcastBundleSize_%s' % dtype.name)
+        check = tf.debugging.assert_equal(
+            broadcast_fn(total, False), total,
+            message='Variables to broadcast differ from root rank')
+        with tf.control_dependencies([check]):
+            flat = tf.concat([tf.reshape(var, [-1]) for var in bundle], 0,
+                             name='BroadcastBundle_%s' % dtype.name)
+        flat = broadcast_fn(flat, False)
+        values = tf.split(flat, sizes)
+        assign_ops.extend(_assign(var, tf.reshape(value, var.shape))
+                          for var, value in zip(bundle, values))
+    return tf.group(*assign_ops)
 
 try:
     _get_default_graph = tf.get_default_graph
@@ -40,7 +40,7 @@ from byteps.tensorflow.keras import callbacks
 def DistributedOptimizer(optimizer, name=None,
                          device_dense='', device_sparse='',
                          compression=Compression.none,
-                         sparse_as_dense=False):
+                         sparse_as_dense=False, compression_params=None):
     """
     An optimizer that wraps another keras.optimizers.Optimizer, using an push_pull to
     average gradient values before applying gradients to model weights.
@@ -58,10 +58,15 @@ def DistributedOptimizer(optimizer, name=None,
                          help improve performance and memory utilization if
                          the original sparse gradient has high density.
                          Defaults to false.
+        compression_params: Optional dict selecting a compressor of BytePS core
+                            used for inter-node communication, e.g.
+                            `{'compressor': 'topk', 'k': 0.001, 'ef': 'vanilla'}`.
+                            See docs/gradient-compression.md for the keys.
+                            Defaults to no inter-node compression.
     """
     return _impl.create_distributed_optimizer(keras, optimizer, name,
                                               device_dense, device_sparse, compression,
-                                              sparse_as_dense)
+                                              sparse_as_dense, compression_params)
 
 
 def broadcast_global_variables(root_rank):
@@ -99,7 +104,8 @@ def broadcast(value, root_rank, name=None):
     return _impl.broadcast(K, value, root_rank, name)
 
 
-def load_model(filepath, custom_optimizers=None, custom_objects=None, compression=Compression.none):
+def load_model(filepath, custom_optimizers=None, custom_objects=None, compression=Compression.none,
+               compression_params=None):
     """
     Loads a saved Keras model with a BytePS DistributedOptimizer.
     The DistributedOptimizer will wrap the underlying optimizer used to train
@@ -119,6 +125,9 @@ def load_model(filepath, custom_optimizers=None, custom_objects=None, compressio
         compression: Compression algorithm used to reduce the amount of data
                      sent and received by each worker node.  Defaults to not
                      using compression.
+        compression_params: Optional dict selecting a compressor of BytePS core
+                            used for inter-node communication. Defaults to no
+                            inter-node compression.
     # Returns
         A Keras model instance.
     # Raises
@@ -126,6 +135,7 @@ def load_model(filepath, custom_optimizers=None, custom_objects=None, compressio
         ValueError: In case of an invalid savefile.
     """
     def wrap_optimizer(cls):
-        return lambda **kwargs: DistributedOptimizer(cls(**kwargs), compression=compression)
+        return lambda **kwargs: DistributedOptimizer(cls(**kwargs), compression=compression,
+                                                      compression_params=compression_params)
     optimizer_modules = {keras.optimizers.Optimizer.__module__}
     return _impl.load_model(keras, wrap_optimizer, optimizer_modules, filepath, custom_optimizers, custom_objects)
@@ -127,9 +127,21 @@ common::ReadyEvent* RecordReadyEvent(::tensorflow::OpKernelContext* context) {
   return nullptr;
 }
 
-extern "C" void byteps_tensorflow_declare_tensor(char* name) {
+extern "C" void byteps_tensorflow_declare_tensor(char* name, int num_args,
+                                                 char** args_keys,
+                                                 char** args_vals) {
   std::string tensor_name(name);
   common::IsTensorDeclared(tensor_name);
+
+  std::unordered_map<std::string, std::string> kwargs;
+  for (int i = 0; i < num_args; ++i) {
+    kwargs[args_keys[i]] = args_vals[i];
+  }
+
+  if (num_args > 0) {
+    common::RegisterCompressor(tensor_name, kwargs);
+  }
+
   return;
 }
 
@@ -51,7 +51,9 @@ class TFTensor : public common::Tensor {
   ::tensorflow::Tensor tensor_;
 };
 
-extern "C" void byteps_tensorflow_declare_tensor(char* name);
+extern "C" void byteps_tensorflow_declare_tensor(char* name, int num_args,
+                                                 char** args_keys,
+                                                 char** args_vals);
 
 }  // namespace tensorflow
 }  // namespace byteps
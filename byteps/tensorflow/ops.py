@@ -107,11 +107,96 @@ def randomString(stringLength=16):
     letters = string.ascii_lowercase
     return ''.join(random.choice(letters) for i in range(stringLength))
 
-def _push_pull(tensor, scope='', name=None):
+_COMPRESSION_PARAMS_KEYS = {"compressor", "k", "scaling", "encode", "partition",
+                            "normalize", "ef", "seed"}
+
+
+def _compressor_kwargs(compression_params):
+    """Translates `compression_params` into the hyper-parameters of the
+    compressors implemented in BytePS core.
+
+    Arguments:
+        compression_params: dict such as
+            `{'compressor': 'topk', 'k': 0.001, 'ef': 'vanilla'}`.
+
+    Returns:
+        A dict of strings to be registered with the tensor.
+    """
+    if not compression_params:
+        return {}
+    if "compressor" not in compression_params:
+        raise ValueError("compression_params must specify a compressor")
+    if "momentum" in compression_params:
+        raise ValueError("compression_params does not support momentum with TensorFlow, "
+                         "use the momentum of the wrapped optimizer instead")
+    if "fp16" in compression_params:
+        raise ValueError("compression_params does not support fp16 with TensorFlow, "
+                         "use compression=Compression.fp16 instead")
+    unknown = set(compression_params) - _COMPRESSION_PARAMS_KEYS
+    if unknown:
+        raise ValueError("Unsupported compression params %s" % ", ".join(sorted(unknown)))
+
+    def _to_str(v):
+        if isinstance(v, (bool, int, float, str)):
+            return str(v).lower()
+        raise ValueError("Invalid compression param %s of type %s" % (v, type(v)))
+
+    compressor = compression_params["compressor"]
+    kwargs = {"compressor_type": compressor}
+    if compressor == "onebit":
+        kwargs["compressor_onebit_scaling"] = compression_params.get("scaling", False)
+    elif compressor in ("topk", "randomk", "dithering"):
+        # raise KeyError if 'k' is not found
+        kwargs["compressor_k"] = compression_params["k"]
+        if compressor == "topk":
+            kwargs["compressor_topk_encode"] = compression_params.get("encode", False)
+    else:
+        raise ValueError("Unsupported compressor %s" % compressor)
+
+    if compression_params.get("partition"):
+        if compression_params["partition"] == "linear":
+            kwargs["dithering_partition"] = 0
+        elif compression_params["partition"] == "natural":
+            kwargs["dithering_partition"] = 1
+        else:
+            raise ValueError("Unsupported partition")
+    if compression_params.get("normalize"):
+        if compression_params["normalize"] == "max":
+            kwargs["dithering_normalize"] = 0
+        elif compression_params["normalize"] == "l2":
+            kwargs["dithering_normalize"] = 1
+        else:
+            raise ValueError("Unsupported normalization")
+    if compression_params.get("ef"):
+        kwargs["ef_type"] = compression_params["ef"]
+    if compression_params.get("seed") is not None:
+        kwargs["seed"] = compression_params["seed"]
+    return {k: _to_str(v) for k, v in kwargs.items()}
+
+
+def _declare_tensor(name, compression_params=None):
+    """Declares a tensor to BytePS core and registers its compressor, if any."""
+    def _create_c_style_string_array(strings):
+        byte_arr = [bytes(string, 'utf-8') for string in strings]
+        arr = (ctypes.c_char_p*len(byte_arr))()
+        arr[:] = byte_arr
+        return arr
+
+    kwargs = _compressor_kwargs(compression_params)
+    TF_LIB_CTYPES.byteps_tensorflow_declare_tensor(
+        ctypes.c_char_p(name.encode("ascii")),
+        ctypes.c_int(len(kwargs)),
+        _create_c_style_string_array(list(kwargs.keys())),
+        _create_c_style_string_array(list(kwargs.values())))
+
+
+def _push_pull(tensor, scope='', name=None, compression_params=None):
     """An op which sums an input tensor over all the BytePS processes.
     The reduction operation is keyed by the name of the op. The tensor type and
     shape must be the same on all BytePS processes for a given name. The reduction
     will not start until all processes are ready to send and receive the tensor.
+    `compression_params` selects a compressor of BytePS core that is applied
+    to the tensor before it is sent to the servers.
     Returns:
       A tensor of the same shape and type as `tensor`, summed across all
       processes.
@@ -130,8 +215,7 @@ def _push_pull(tensor, scope='', name=None):
     full_name = scope + name
     if not full_name:
         full_name = "empty_name_" + randomString()
-    full_name_ascii = full_name.encode("ascii")
-    TF_LIB_CTYPES.byteps_tensorflow_declare_tensor(ctypes.c_char_p(full_name_ascii))
+    _declare_tensor(full_name, compression_params)
     return C_LIB.byteps_push_pull(tensor, name=name, input_name = full_name)
 
 
@@ -172,9 +256,8 @@ def broadcast(tensor, root_rank, scope='', name=None, is_variable=True):
     full_name = scope + name
     if not full_name:
         full_name = "empty_name_" + randomString()
-    full_name_ascii = full_name.encode("ascii")
 
-    TF_LIB_CTYPES.byteps_tensorflow_declare_tensor(ctypes.c_char_p(full_name_ascii))
+    _declare_tensor(full_name)
     if root_rank != rank():
         if is_variable:
             if hasattr(tf, 'assign_sub'):
@@ -8,20 +8,21 @@
 # schedule adjustments with a warmup, randomized data reading, and checkpointing on the first worker
 # only.
 #
-# Note: This model uses Keras native ImageDataGenerator and not the sophisticated preprocessing
-# pipeline that is typically used to train state-of-the-art ResNet-50 model.  This results in ~0.5%
-# increase in the top-1 validation error compared to the single-crop top-1 validation error from
-# https://github.com/KaimingHe/deep-residual-networks.
+# Note: This model reads JPEG files with a tf.data pipeline that decodes and augments images in
+# parallel and prefetches batches, so the input pipeline overlaps with the training step. It does not
+# use the sophisticated preprocessing pipeline that is typically used to train state-of-the-art
+# ResNet-50 model.  This results in ~0.5% increase in the top-1 validation error compared to the
+# single-crop top-1 validation error from https://github.com/KaimingHe/deep-residual-networks.
 #
 from __future__ import print_function
 
 import argparse
 import tensorflow.keras as keras
 from tensorflow.keras import backend as K
-from tensorflow.keras.preprocessing import image
 import tensorflow as tf
-import byteps.keras as bps
+import byteps.tensorflow.keras as bps
 import os
+import subprocess
 
 parser = argparse.ArgumentParser(description='Keras ImageNet Example',
                                  formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -35,6 +36,34 @@ parser.add_argument('--checkpoint-format', default='./checkpoint-{epoch}.h5',
                     help='checkpoint file format')
 parser.add_argument('--fp16-pushpull', action='store_true', default=False,
                     help='use fp16 compression during pushpull')
+parser.add_argument('--compression', default='none',
+                    choices=['none', 'dgc', 'signsgd', 'qsgd8'],
+                    help='inter-node gradient compression done by BytePS core; '
+                         'dgc sends the top-k gradient entries with error feedback, '
+                         'signsgd sends one sign bit per entry and qsgd8 quantizes '
+                         'entries to 8 bits')
+parser.add_argument('--compress-ratio', type=float, default=0.001,
+                    help='fraction of gradient entries sent by dgc')
+parser.add_argument('--mixed-precision', action='store_true', default=False,
+                    help='train with float16 compute and float32 variables (tensor cores)')
+parser.add_argument('--xla', action='store_true', default=False,
+                    help='compile the model with XLA to fuse conv, BN and activation kernels')
+parser.add_argument('--dali', action='store_true', default=False,
+                    help='decode and augment images on the GPU with NVIDIA DALI')
+parser.add_argument('--optimizer', default='sgd', choices=['sgd', 'lars'],
+                    help='optimizer; lars keeps training stable with much larger '
+                         '--batch-size, which means fewer push_pull rounds per epoch')
+parser.add_argument('--lars-eta', type=float, default=0.001,
+                    help='LARS trust coefficient')
+parser.add_argument('--data-threads', type=int, default=0,
+                    help='threads decoding images for each worker; 0 splits the CPU cores '
+                         'evenly between the workers of a machine')
+parser.add_argument('--drop-caches', action='store_true', default=False,
+                    help='drop the page cache of every machine before training so that the '
+                         'first epoch reads from disk (needs passwordless sudo)')
+parser.add_argument('--colocate', action='store_true', default=False,
+                    help='a BytePS server runs on every worker machine; exchange '
+                         'tensors with it through shared memory')
 
 # Default settings from https://arxiv.org/abs/1706.02677.
 parser.add_argument('--batch-size', type=int, default=32,
@@ -54,15 +83,38 @@ parser.add_argument('--wd', type=float, default=0.00005,
 
 args = parser.parse_args()
 
+# BytePS: when there are no dedicated CPU server machines, launch one server next to every worker
+# (co-locate mode, see docs/best-practice.md). The worker and its local server then exchange
+# tensors through shared memory instead of the network stack. The servers must be launched with
+# BYTEPS_ENABLE_IPC=1 as well, and may want more BYTEPS_SERVER_ENGINE_THREAD when they are the
+# bottleneck. An explicit setting in the environment takes precedence.
+if args.colocate:
+    os.environ.setdefault('BYTEPS_ENABLE_IPC', '1')
+
 # initialize BytePS
 bps.init()
 
+# Start from a cold page cache, once per machine, so that runs are reproducible.
+if args.drop_caches and bps.local_rank() == 0:
+    if subprocess.run(['sync'], check=False).returncode != 0 or \
+            subprocess.run(['sudo', '-n', 'sysctl', '-q', 'vm.drop_caches=3'],
+                           check=False).returncode != 0:
+        print('Warning: could not drop the page cache, --drop-caches needs passwordless sudo.')
+
 # BytePS: pin GPU to be used to process local rank (one GPU per process)
 config = tf.ConfigProto()
 config.gpu_options.allow_growth = True
 config.gpu_options.visible_device_list = str(bps.local_rank())
+if args.xla:
+    config.graph_options.optimizer_options.global_jit_level = tf.OptimizerOptions.ON_1
 K.set_session(tf.Session(config=config))
 
+# Use NHWC for both the input pipelines and the model, regardless of keras.json. This has to
+# happen before the pipelines are built, because tf.data traces `preprocess_input` right away.
+# On GPUs with tensor cores cuDNN's fastest convolutions are NHWC, so this also avoids layout
+# transposes around every conv.
+K.set_image_data_format('channels_last')
+
 # If set > 0, will resume training from a given checkpoint.
 resume_from_epoch = 0
 for try_epoch in range(args.epochs, 0, -1):
@@ -77,20 +129,195 @@ resume_from_epoch = bps.broadcast(resume_from_epoch, 0, name='resume_from_epoch'
 # BytePS: print logs on the first worker.
 verbose = 1 if bps.rank() == 0 else 0
 
-# Training data iterator.
-train_gen = image.ImageDataGenerator(
-    width_shift_range=0.33, height_shift_range=0.33, zoom_range=0.5, horizontal_flip=True,
-    preprocessing_function=keras.applications.resnet50.preprocess_input)
-train_iter = train_gen.flow_from_directory(args.train_dir,
-                                           batch_size=args.batch_size,
-                                           target_size=(224, 224))
-
-# Validation data iterator.
-test_gen = image.ImageDataGenerator(
-    zoom_range=(0.875, 0.875), preprocessing_function=keras.applications.resnet50.preprocess_input)
-test_iter = test_gen.flow_from_directory(args.val_dir,
-                                         batch_size=args.val_batch_size,
-                                         target_size=(224, 224))
+
+def list_images(data_dir):
+    """Lists the JPEG files under `data_dir` with one sub-directory per class,
+    the same layout `ImageDataGenerator.flow_from_directory` expects."""
+    classes = sorted(d for d in os.listdir(data_dir)
+                     if os.path.isdir(os.path.join(data_dir, d)))
+    files, labels = [], []
+    for label, cls in enumerate(classes):
+        for fname in sorted(os.listdir(os.path.join(data_dir, cls))):
+            if fname.lower().endswith(('.jpg', '.jpeg')):
+                files.append(os.path.join(data_dir, cls, fname))
+                labels.append(label)
+    return files, labels, len(classes)
+
+
+def parse_train(filename, label):
+    # Only decode the randomly sampled crop instead of the whole image.
+    image_bytes = tf.io.read_file(filename)
+    begin, size, _ = tf.image.sample_distorted_bounding_box(
+        tf.image.extract_jpeg_shape(image_bytes),
+        bounding_boxes=tf.constant([0.0, 0.0, 1.0, 1.0], shape=[1, 1, 4]),
+        aspect_ratio_range=(3. / 4., 4. / 3.), area_range=(0.25, 1.0),
+        use_image_if_no_bounding_boxes=True)
+    offset_y, offset_x, _ = tf.unstack(begin)
+    crop_height, crop_width, _ = tf.unstack(size)
+    image = tf.image.decode_and_crop_jpeg(
+        image_bytes, tf.stack([offset_y, offset_x, crop_height, crop_width]), channels=3)
+    image = tf.image.resize(image, [224, 224])
+    image = tf.image.random_flip_left_right(image)
+    image = keras.applications.resnet50.preprocess_input(image)
+    return image, tf.one_hot(label, num_classes)
+
+
+def parse_val(filename, label):
+    # Central crop of 87.5% of the shorter side, resized to 224x224.
+    image_bytes = tf.io.read_file(filename)
+    shape = tf.image.extract_jpeg_shape(image_bytes)
+    height, width = shape[0], shape[1]
+    crop_size = tf.cast(0.875 * tf.cast(tf.minimum(height, width), tf.float32), tf.int32)
+    offset_y = (height - crop_size) // 2
+    offset_x = (width - crop_size) // 2
+    image = tf.image.decode_and_crop_jpeg(
+        image_bytes, tf.stack([offset_y, offset_x, crop_size, crop_size]), channels=3)
+    image = tf.image.resize(image, [224, 224])
+    # Keep the decoded crops in uint8 so that the cached validation set stays small.
+    return tf.saturate_cast(image, tf.uint8), label
+
+
+def preprocess_val(image, label):
+    image = keras.applications.resnet50.preprocess_input(tf.cast(image, tf.float32))
+    return image, tf.one_hot(label, num_classes)
+
+
+def dali_dataset(files, labels, batch_size, training):
+    """Builds a DALI pipeline that decodes JPEGs with nvJPEG and augments them on the GPU,
+    wrapped as a tf.data.Dataset for Keras. `files` and `labels` are the shard of this worker."""
+    import nvidia.dali.fn as fn
+    import nvidia.dali.types as types
+    import nvidia.dali.plugin.tf as dali_tf
+    from nvidia.dali.pipeline import Pipeline
+
+    pipe = Pipeline(batch_size=batch_size, num_threads=4, device_id=bps.local_rank())
+    with pipe:
+        jpegs, label = fn.readers.file(files=files, labels=labels, random_shuffle=training)
+        images = fn.decoders.image(jpegs, device='mixed', output_type=types.BGR)
+        if training:
+            images = fn.random_resized_crop(images, size=(224, 224), random_area=(0.25, 1.0))
+            mirror = fn.random.coin_flip(probability=0.5)
+        else:
+            images = fn.resize(images, resize_shorter=256)
+            mirror = 0
+        # Same normalization as `keras.applications.resnet50.preprocess_input`.
+        images = fn.crop_mirror_normalize(images, dtype=types.FLOAT, output_layout='HWC',
+                                          crop=(224, 224), mean=[103.939, 116.779, 123.68],
+                                          std=[1., 1., 1.], mirror=mirror)
+        label = fn.one_hot(label, num_classes=num_classes)
+        pipe.set_outputs(images, label.gpu())
+
+    with tf.device('/gpu:0'):
+        return dali_tf.DALIDataset(pipeline=pipe, batch_size=batch_size, device_id=bps.local_rank(),
+                                   output_shapes=((batch_size, 224, 224, 3),
+                                                  (batch_size, num_classes)),
+                                   output_dtypes=(tf.float32, tf.float32))
+
+
+class LARSOptimizer(keras.optimizers.Optimizer):
+    """Momentum SGD with Layer-wise Adaptive Rate Scaling, see https://arxiv.org/abs/1708.03888.
+    The learning rate of every weight tensor is scaled by its trust ratio
+    `eta * ||w|| / (||g|| + weight_decay * ||w||)`. Biases and BN parameters are updated with
+    plain momentum SGD."""
+
+    def __init__(self, learning_rate=0.01, momentum=0.9, eta=0.001, weight_decay=0.0,
+                 name='LARSOptimizer', **kwargs):
+        super(LARSOptimizer, self).__init__(name, **kwargs)
+        self._set_hyper('learning_rate', kwargs.get('lr', learning_rate))
+        self._set_hyper('decay', self._initial_decay)
+        self._set_hyper('momentum', momentum)
+        self._eta = eta
+        self._weight_decay = weight_decay
+
+    def _create_slots(self, var_list):
+        for var in var_list:
+            self.add_slot(var, 'momentum')
+
+    def _resource_apply_dense(self, grad, var, apply_state=None):
+        var_dtype = var.dtype.base_dtype
+        lr = self._decayed_lr(var_dtype)
+        momentum = self._get_hyper('momentum', var_dtype)
+        if var.shape.ndims > 1:
+            w_norm = tf.norm(var)
+            g_norm = tf.norm(grad)
+            trust_ratio = self._eta * w_norm / (g_norm + self._weight_decay * w_norm)
+            # Fall back to the global learning rate for all-zero weights or gradients.
+            lr *= tf.where(tf.logical_and(w_norm > 0, g_norm > 0),
+                           trust_ratio, tf.ones_like(trust_ratio))
+        m = self.get_slot(var, 'momentum')
+        m_t = m.assign(momentum * m + lr * grad, use_locking=self._use_locking)
+        return var.assign_sub(m_t, use_locking=self._use_locking).op
+
+    def get_config(self):
+        config = super(LARSOptimizer, self).get_config()
+        config.update({
+            'learning_rate': self._serialize_hyperparameter('learning_rate'),
+            'decay': self._serialize_hyperparameter('decay'),
+            'momentum': self._serialize_hyperparameter('momentum'),
+            'eta': self._eta,
+            'weight_decay': self._weight_decay,
+        })
+        return config
+
+
+train_files, train_labels, num_classes = list_images(args.train_dir)
+val_files, val_labels, _ = list_images(args.val_dir)
+# BytePS: every worker reads a different 1 / N shard of the data set, where N is the number of
+# workers. Shards differ by at most one file, so all workers run the same number of steps.
+train_steps = len(train_files) // bps.size() // args.batch_size
+val_steps = -(-len(val_files) // bps.size() // args.val_batch_size)
+train_files = train_files[bps.rank()::bps.size()]
+train_labels = train_labels[bps.rank()::bps.size()]
+val_files = val_files[bps.rank()::bps.size()]
+val_labels = val_labels[bps.rank()::bps.size()]
+# Every worker validates on exactly `val_steps` full batches, so that each pass over the
+# validation data starts at the beginning of the shard and the scores of all workers carry the
+# same weight. Shards are padded with their own first files to get there, so less than one batch
+# per worker is evaluated twice.
+val_padding = val_steps * args.val_batch_size - len(val_files)
+val_files = val_files + [val_files[i % len(val_files)] for i in range(val_padding)]
+val_labels = val_labels + [val_labels[i % len(val_labels)] for i in range(val_padding)]
+
+if args.dali:
+    train_dataset = dali_dataset(train_files, train_labels, args.batch_size, training=True)
+    val_dataset = dali_dataset(val_files, val_labels, args.val_batch_size, training=False)
+else:
+    # Decode on a private thread pool sized so that the workers of a machine do not oversubscribe
+    # its cores, and keep every decode single-threaded so that parallelism comes from the pool.
+    data_options = tf.data.Options()
+    data_options.experimental_threading.private_threadpool_size = \
+        args.data_threads or max(1, os.cpu_count() // bps.local_size())
+    data_options.experimental_threading.max_intra_op_parallelism = 1
+
+    # Training data pipeline. Batches have a static shape, so XLA compiles the step once and
+    # cuDNN autotunes every convolution once. The last stage copies upcoming batches to the GPU
+    # while the current step runs, so the host-to-device transfer overlaps with compute.
+    train_dataset = tf.data.Dataset.from_tensor_slices((train_files, train_labels)) \
+        .shuffle(len(train_files)) \
+        .repeat() \
+        .map(parse_train, num_parallel_calls=tf.data.experimental.AUTOTUNE) \
+        .batch(args.batch_size, drop_remainder=True) \
+        .prefetch(tf.data.experimental.AUTOTUNE) \
+        .with_options(data_options) \
+        .apply(tf.data.experimental.prefetch_to_device('/gpu:0', buffer_size=2))
+
+    # Validation data pipeline. The decoded validation batches are cached in memory, so only
+    # the first pass over them pays for JPEG decoding; later passes only normalize whole batches.
+    val_dataset = tf.data.Dataset.from_tensor_slices((val_files, val_labels)) \
+        .map(parse_val, num_parallel_calls=tf.data.experimental.AUTOTUNE) \
+        .batch(args.val_batch_size) \
+        .cache() \
+        .repeat() \
+        .map(preprocess_val, num_parallel_calls=tf.data.experimental.AUTOTUNE) \
+        .prefetch(tf.data.experimental.AUTOTUNE) \
+        .with_options(data_options)
+
+# Mixed precision runs the model in fp16 on tensor cores, which is independent of
+# --fp16-pushpull that only compresses the gradients being pushed and pulled.
+# TensorFlow 1 only accepts a mixed policy once layers follow the V2 dtype behavior.
+if args.mixed_precision:
+    tf.compat.v1.keras.layers.enable_v2_dtype_behavior()
+    tf.keras.mixed_precision.experimental.set_policy('mixed_float16')
 
 # Set up standard ResNet-50 model.
 model = keras.applications.resnet50.ResNet50(weights=None)
@@ -98,34 +325,68 @@ model = keras.applications.resnet50.ResNet50(weights=None)
 # BytePS: (optional) compression algorithm.
 compression = bps.Compression.fp16 if args.fp16_pushpull else bps.Compression.none
 
+# BytePS: (optional) inter-node compression, done by BytePS core between workers and servers.
+# Deep Gradient Compression only sends the largest `k` gradient entries of every tensor and
+# accumulates the rest locally (error feedback) until they become large enough to be sent.
+# The selected entries are packed as varint index gaps and fp16 values, about half the size of
+# raw (int32 index, float32 value) pairs.
+# signSGD sends the sign bit of every entry plus one scale (the mean absolute value) per tensor,
+# and QSGD stochastically rounds every entry to one of 127 levels of the tensor's max magnitude,
+# i.e. a sign and 7 bits.
+compression_params = None
+if args.compression == 'dgc':
+    compression_params = {'compressor': 'topk', 'k': args.compress_ratio, 'ef': 'vanilla',
+                          'encode': True}
+elif args.compression == 'signsgd':
+    compression_params = {'compressor': 'onebit', 'scaling': True, 'ef': 'vanilla'}
+elif args.compression == 'qsgd8':
+    compression_params = {'compressor': 'dithering', 'k': 127,
+                          'partition': 'linear', 'normalize': 'max'}
+
 # Restore from a previous checkpoint, if initial_epoch is specified.
 # BytePS: restore on the first worker which will broadcast both model and optimizer weights
 # to other workers.
 if resume_from_epoch > 0 and bps.rank() == 0:
     model = bps.load_model(args.checkpoint_format.format(epoch=resume_from_epoch),
-                           compression=compression)
+                           custom_optimizers=[LARSOptimizer],
+                           compression=compression,
+                           compression_params=compression_params)
 else:
     # ResNet-50 model that is included with Keras is optimized for inference.
     # Add L2 weight decay & adjust BN settings.
     model_config = model.get_config()
+    regularizer = keras.regularizers.l2(args.wd)
+    regularizer_config = {'class_name': regularizer.__class__.__name__,
+                          'config': regularizer.get_config()}
     for layer, layer_config in zip(model.layers, model_config['layers']):
         if hasattr(layer, 'kernel_regularizer'):
-            regularizer = keras.regularizers.l2(args.wd)
-            layer_config['config']['kernel_regularizer'] = \
-                {'class_name': regularizer.__class__.__name__,
-                 'config': regularizer.get_config()}
+            layer_config['config']['kernel_regularizer'] = regularizer_config
         if type(layer) == keras.layers.BatchNormalization:
             layer_config['config']['momentum'] = 0.9
             layer_config['config']['epsilon'] = 1e-5
+        if args.mixed_precision and layer is model.layers[-1]:
+            # Compute the softmax output in fp32 to keep the loss numerically stable.
+            layer_config['config']['dtype'] = 'float32'
 
     model = keras.models.Model.from_config(model_config)
 
     # BytePS: adjust learning rate based on number of GPUs.
-    opt = keras.optimizers.SGD(lr=args.base_lr * bps.size(),
-                               momentum=args.momentum)
+    if args.optimizer == 'lars':
+        # The gradients already contain the L2 term of the kernel regularizers, so the
+        # weight decay only enters the trust ratio here.
+        opt = LARSOptimizer(lr=args.base_lr * bps.size(), momentum=args.momentum,
+                            eta=args.lars_eta, weight_decay=args.wd)
+    else:
+        opt = keras.optimizers.SGD(lr=args.base_lr * bps.size(),
+                                   momentum=args.momentum)
+
+    # Scale the loss to keep small fp16 gradients from underflowing.
+    if args.mixed_precision:
+        opt = tf.keras.mixed_precision.experimental.LossScaleOptimizer(opt, loss_scale='dynamic')
 
     # BytePS: add BytePS Distributed Optimizer.
-    opt = bps.DistributedOptimizer(opt, compression=compression)
+    opt = bps.DistributedOptimizer(opt, compression=compression,
+                                   compression_params=compression_params)
 
     model.compile(loss=keras.losses.categorical_crossentropy,
                   optimizer=opt,
@@ -160,22 +421,19 @@ if bps.rank() == 0:
     callbacks.append(keras.callbacks.ModelCheckpoint(args.checkpoint_format))
     callbacks.append(keras.callbacks.TensorBoard(args.log_dir))
 
-# Train the model. The training will randomly sample 1 / N batches of training data and
-# 3 / N batches of validation data on every worker, where N is the number of workers.
-# Over-sampling of validation data helps to increase probability that every validation
-# example will be evaluated.
-model.fit_generator(train_iter,
-                    steps_per_epoch=len(train_iter) // bps.size(),
-                    callbacks=callbacks,
-                    epochs=args.epochs,
-                    verbose=verbose,
-                    workers=4,
-                    initial_epoch=resume_from_epoch,
-                    validation_data=test_iter,
-                    validation_steps=3 * len(test_iter) // bps.size())
-
-# Evaluate the model on the full data set.
-score = bps.push_pull(model.evaluate_generator(test_iter, len(test_iter), workers=4))
+# Train the model. Every epoch each worker goes over its shard of the training data once and
+# validates on its padded shard of the validation data, so every validation example is evaluated.
+model.fit(train_dataset,
+          steps_per_epoch=train_steps,
+          callbacks=callbacks,
+          epochs=args.epochs,
+          verbose=verbose,
+          initial_epoch=resume_from_epoch,
+          validation_data=val_dataset,
+          validation_steps=val_steps)
+
+# Evaluate the model on the full data set, averaging the scores of all padded shards.
+score = bps.push_pull(model.evaluate(val_dataset, steps=val_steps))
 if verbose:
     print('Test loss:', score[0])
     print('Test accuracy:', score[1])
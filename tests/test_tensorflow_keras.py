@@ -19,6 +19,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import itertools
+import os
+import tempfile
 import tensorflow as tf
 import numpy as np
 import warnings
@@ -27,9 +30,27 @@ from distutils.version import LooseVersion
 from tensorflow import keras
 from tensorflow.python.keras import backend as K
 
+import byteps.tensorflow as byteps_tf
 import byteps.tensorflow.keras as bps
+from byteps.tensorflow import broadcast_variables, _broadcast_bundled
 
-class TfKerasTests:
+
+def topk(x, k):
+    y = x.flatten()
+    indices = np.argsort(np.abs(y))[-k:][::-1]
+    vals = y[indices]
+    y.fill(0)
+    for idx, val in zip(indices, vals):
+        y[idx] = val
+    return y.reshape(x.shape)
+
+
+def fp16(x):
+    # same rounding as the `encode` option of the topk compressor
+    return np.clip(x, -65504, 65504).astype(np.float16).astype(x.dtype)
+
+
+class TfKerasTests(tf.test.TestCase):
     """
     Tests for ops in byteps.keras.
     """
@@ -97,7 +118,165 @@ class TfKerasTests:
             # No assertions, we just need to verify that it doesn't hang
             model.train_on_batch(x, y)
 
+    def test_compression_params(self):
+        with self.test_session(config=self.config) as sess:
+            K.set_session(sess)
+
+            # The same on every rank, large enough to exceed BYTEPS_MIN_COMPRESS_BYTES and small
+            # enough for one partition.
+            x = np.random.RandomState(0).normal(size=(1024, 64)).astype(np.float32)
+            for k, encode in itertools.product([1, 3, 5], [False, True]):
+                params = {'compressor': 'topk', 'k': k, 'encode': encode}
+                tensor = tf.constant(x, name='compression_params_%d_%d' % (k, encode))
+                result = sess.run(byteps_tf.push_pull(tensor, compression_params=params))
+
+                # The worker compresses the tensor, and the server compresses the sum again.
+                expected = topk(x, k)
+                if encode:
+                    expected = fp16(expected)
+                expected = topk(expected, k) * bps.size()
+                if encode:
+                    expected = fp16(expected)
+                expected /= bps.size()
+                assert np.allclose(result, expected), \
+                    'push_pull with compression_params %s produces incorrect results' % params
+
+    def _broadcast_test_variables(self, prefix, rank, shapes):
+        variables = [tf.Variable(np.full(shape, 10 * rank + i, dtype=dtype),
+                                 name='%s_broadcast_var_%d' % (prefix, i))
+                     for i, (shape, dtype) in enumerate(shapes)]
+        K.get_session().run([var.initializer for var in variables])
+        return variables
+
+    def test_broadcast_variables(self):
+        with self.test_session(config=self.config) as sess:
+            K.set_session(sess)
+
+            # Variables of different shapes and dtypes, initialized differently on every rank
+            # and listed in a different order on non-root ranks.
+            root_rank = 0
+            shapes = [((4, 5), np.float32), ((7,), np.float32), ((3, 2), np.int32)]
+
+            # Bundling does not run with a single worker, so replay the tensors sent by a
+            # simulated root rank to check it regardless of the number of workers.
+            root_variables = self._broadcast_test_variables('root', root_rank, shapes)
+            variables = self._broadcast_test_variables('local', root_rank + 1, shapes)
+            sent = []
+
+            def record(tensor, is_variable):
+                sent.append(tensor)
+                return tensor
+
+            sess.run(_broadcast_bundled(root_variables, record))
+            sess.run(_broadcast_bundled(variables[::-1], lambda tensor, is_variable: sent.pop(0)))
+            for i, value in enumerate(sess.run(variables)):
+                assert np.all(value == 10 * root_rank + i), \
+                    'bundled broadcast produces incorrect broadcasted variables'
+
+            if bps.size() > 1:
+                variables = self._broadcast_test_variables('bps', bps.rank(), shapes)
+                order = variables if bps.rank() == root_rank else variables[::-1]
+                sess.run(broadcast_variables(order, root_rank))
+                for i, value in enumerate(sess.run(variables)):
+                    assert np.all(value == 10 * root_rank + i), \
+                        'bps.broadcast_variables produces incorrect broadcasted variables'
+
+    def test_broadcast_variables_size_mismatch(self):
+        with self.test_session(config=self.config) as sess:
+            K.set_session(sess)
+
+            # This rank has one more float32 variable than the simulated root rank. Only the
+            # bundle sizes of the root rank are replayed, as the bundles themselves no longer fit.
+            shapes = [((4, 5), np.float32), ((3, 2), np.int32)]
+            root_variables = self._broadcast_test_variables('root_mismatch', 0, shapes)
+            variables = self._broadcast_test_variables(
+                'local_mismatch', 1, shapes + [((2,), np.float32)])
+            sizes = []
+
+            def record(tensor, is_variable):
+                if tensor.shape.ndims == 0:
+                    sizes.append(tensor)
+                return tensor
+
+            def replay(tensor, is_variable):
+                return sizes.pop(0) if tensor.shape.ndims == 0 else tensor
+
+            sess.run(_broadcast_bundled(root_variables, record))
+            with self.assertRaisesRegex(tf.errors.InvalidArgumentError,
+                                        'Variables to broadcast differ from root rank'):
+                sess.run(_broadcast_bundled(variables, replay))
+
+    def test_load_model_loss_scale_optimizer(self):
+        with self.test_session(config=self.config) as sess:
+            K.set_session(sess)
+
+            opt = keras.optimizers.SGD(lr=0.0001, momentum=0.9)
+            opt = keras.mixed_precision.experimental.LossScaleOptimizer(opt, loss_scale='dynamic')
+            opt = bps.DistributedOptimizer(opt)
+
+            model = keras.models.Sequential()
+            model.add(keras.layers.Dense(2, input_shape=(3,)))
+            model.compile(loss=keras.losses.mean_squared_error,
+                          optimizer=opt)
+
+            x = np.random.random((1, 3))
+            y = np.random.random((1, 2))
+            model.train_on_batch(x, y)
+
+            fd, fname = tempfile.mkstemp('.h5')
+            os.close(fd)
+            try:
+                model.save(fname)
+                new_model = bps.load_model(fname)
+            finally:
+                os.remove(fname)
+
+            new_opt = new_model.optimizer
+            assert type(new_opt).__name__ == 'LossScaleOptimizer', \
+                'bps.load_model restores %s instead of LossScaleOptimizer' % type(new_opt).__name__
+            assert '_push_pull' in type(new_opt).__dict__, \
+                'bps.load_model does not wrap LossScaleOptimizer with DistributedOptimizer'
+            assert type(new_opt._optimizer).__name__ == 'SGD', \
+                'bps.load_model restores a LossScaleOptimizer wrapping %s instead of SGD' \
+                % type(new_opt._optimizer).__name__
+            for weight, new_weight in zip(model.get_weights(), new_model.get_weights()):
+                assert np.array_equal(weight, new_weight), \
+                    'bps.load_model restores incorrect model weights'
+
+    def test_lr_callbacks_loss_scale_optimizer(self):
+        with self.test_session(config=self.config) as sess:
+            K.set_session(sess)
+
+            opt = keras.optimizers.SGD(lr=0.01, momentum=0.9)
+            opt = keras.mixed_precision.experimental.LossScaleOptimizer(opt, loss_scale='dynamic')
+            opt = bps.DistributedOptimizer(opt)
+
+            model = keras.models.Sequential()
+            model.add(keras.layers.Dense(2, input_shape=(3,)))
+            model.compile(loss=keras.losses.mean_squared_error,
+                          optimizer=opt)
+
+            x = np.random.random((2, 3))
+            y = np.random.random((2, 2))
+            momenta = []
+            callbacks = [
+                bps.callbacks.LearningRateScheduleCallback(multiplier=0.5, initial_lr=0.01),
+                keras.callbacks.LambdaCallback(on_batch_begin=lambda batch, logs: momenta.append(
+                    K.get_value(opt._optimizer.momentum))),
+            ]
+            model.fit(x, y, batch_size=1, callbacks=callbacks, epochs=1, verbose=0)
+
+            assert np.isclose(K.get_value(opt._optimizer.lr), 0.005), \
+                'LearningRateScheduleCallback does not adjust the wrapped learning rate'
+            assert np.allclose(momenta, [0.45, 0.9]), \
+                'LearningRateScheduleCallback does not correct the wrapped momentum'
+
 
 if __name__ == '__main__':
     keras_test = TfKerasTests()
     keras_test.test_train_model()
+    keras_test.test_compression_params()
+    keras_test.test_broadcast_variables()
+    keras_test.test_broadcast_variables_size_mismatch()
+    keras_test.test_load_model_loss_scale_optimizer()
+    keras_test.test_lr_callbacks_loss_scale_optimizer()
@@ -40,9 +40,14 @@ def topk(x, k):
     return y.reshape(x.shape)
 
 
+def fp16(x):
+    # same rounding as the `encode` option of the topk compressor
+    return np.clip(x, -65504, 65504).astype(np.float16).astype(x.dtype)
+
+
 class TopkTestCase(unittest.TestCase, metaclass=MetaTest):
-    @parameterized.expand(itertools.product([1, 3, 5]))
-    def test_topk(self, k):
+    @parameterized.expand(itertools.product([1, 3, 5], [False, True]))
+    def test_topk(self, k, encode):
         ctx = mx.gpu(0)
         net = get_model("resnet18_v2")
         net.initialize(mx.init.Xavier(), ctx=ctx)
@@ -56,6 +61,7 @@ class TopkTestCase(unittest.TestCase, metaclass=MetaTest):
         compression_params = {
             "compressor": "topk",
             "k": k,
+            "encode": encode,
         }
 
         trainer = bps.DistributedTrainer(net.collect_params(
@@ -95,8 +101,12 @@ class TopkTestCase(unittest.TestCase, metaclass=MetaTest):
                 if param.grad_req != "null":
                     g = gs[i] / (batch_size * bps.size())
                     c = topk(g, k)
+                    if encode:
+                        c = fp16(c)
 
                     cs = topk(c, k)
+                    if encode:
+                        cs = fp16(cs)
                     c = cs
 
                     params[i] -= optimizer_params["learning_rate"] * c